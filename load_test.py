@@ -0,0 +1,556 @@
+"""load_test.py
+===============
+CLI load generator for the Flask JSON API. Starts the app locally against
+a **temporary** copy of the database, replays a configurable traffic mix
+at increasing concurrency levels and prints one JSON report so we can size
+deployments and spot contention between the solver and SQLite.
+
+Algorithm
+---------
+1. Build a throw‑away ``poker.db`` in a temp dir from ``schema.sql`` and
+   seed ``quiz_bank`` with stub rows shaped like **seed_quiz.py**’s (random
+   advice instead of a ~1 s solve per row – the load only needs the JSON).
+2. Spawn ``--workers`` child processes (``--serve``), each pointing
+   ``app.DB_PATH`` and ``quiz_backend.DB_PATH`` at that file and running a
+   threaded Werkzeug server on its own port.  The solver is CPU‑bound pure
+   Python, so the request threads of ONE process share one GIL ⇒ a single
+   worker tops out at one core however big the box is.  Use
+   ``--workers N`` to approximate ``gunicorn -w N`` (clients are spread
+   round‑robin across the ports, all processes share the temp DB).
+3. For every concurrency level:
+   • start *N* client threads; each loops until the deadline
+   • every iteration picks an action by weight from the mix
+       – ``solve``   → POST /api/solve (street + villains drawn from mix)
+       – ``history`` → GET  /api/history
+       – ``quiz``    → GET  /api/quiz/next then POST /api/quiz/answer
+   • record (endpoint, latency, status) for every HTTP call
+   • ask the server how many ``database is locked`` errors it logged
+4. Emit throughput, p50/p90/p99 latency and error counts per level and per
+   endpoint as JSON (stdout or ``--out``).
+
+Usage
+-----
+::
+
+    python load_test.py                              # default mix, 1..16
+    python load_test.py --levels 1,4,8 --duration 20
+    python load_test.py --workers 4 --levels 4,8,16  # one process per core
+    python load_test.py --mix mix.json --out report.json
+
+``--mix`` takes a JSON file with any subset of the keys in ``DEFAULT_MIX``;
+missing keys fall back to the defaults.
+"""
+
+import argparse
+import json
+import logging
+import math
+import pathlib
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.request
+from contextlib import closing
+
+# ------------------------------------------------------------------------
+# Constants
+# ------------------------------------------------------------------------
+ROOT = pathlib.Path(__file__).resolve().parent
+SCHEMA_FILE = ROOT / "schema.sql"
+
+RANKS = "23456789TJQKA"
+SUITS = "shdc"
+DECK = [r + s for r in RANKS for s in SUITS]   # 52‑card deck
+POSITIONS = ["BTN", "CO", "HJ", "UTG", "SB", "BB"]
+
+# Number of community cards already dealt on each street
+BOARD_SIZE = {"preflop": 0, "flop": 3, "turn": 4, "river": 5}
+
+# Relative weights – they don’t need to sum to 1
+DEFAULT_MIX = {
+    "actions": {"solve": 0.5, "history": 0.2, "quiz": 0.3},
+    "streets": {"preflop": 0.55, "flop": 0.25, "turn": 0.12, "river": 0.08},
+    "villains": {"1": 0.6, "2": 0.25, "3": 0.1, "4": 0.05},
+}
+
+# Hero + full board + two hole cards per villain must fit in one deck
+MAX_VILLAINS = (len(DECK) - 2 - 5) // 2          # 22
+
+# Pause after a failed connection so a dead server isn’t hammered in a
+# tight loop that floods the level with error samples
+CONNECT_BACKOFF_S = 0.1
+
+# Harness‑only route exposed by the --serve child process
+STATS_ROUTE = "/_loadtest/stats"
+
+# ------------------------------------------------------------------------
+# Server side (child process) – runs the real app on a temp DB
+# ------------------------------------------------------------------------
+
+
+class _LockCounter(logging.Handler):
+    """Count logged exceptions caused by SQLite lock timeouts."""
+
+    def __init__(self):
+        super().__init__()
+        self.locked = 0
+        self.other = 0
+        self._mutex = threading.Lock()
+
+    def emit(self, record):
+        if not record.exc_info:
+            return
+        exc = record.exc_info[1]
+        with self._mutex:
+            if (isinstance(exc, sqlite3.OperationalError)
+                    and "locked" in str(exc)):
+                self.locked += 1
+            else:
+                self.other += 1
+
+
+def serve(port: int, db_path: str):
+    """Run app.py on 127.0.0.1:*port* using *db_path* as its database."""
+    from flask import jsonify
+    from werkzeug.serving import make_server
+
+    import app as app_module
+    import quiz_backend
+
+    # Both modules resolve poker.db at import time – repoint them
+    app_module.DB_PATH = pathlib.Path(db_path)
+    quiz_backend.DB_PATH = pathlib.Path(db_path)
+
+    flask_app = app_module.app
+    flask_app.config.update(TEMPLATES_AUTO_RELOAD=False)
+
+    # Flask logs unhandled errors and quiz_backend failures via app.logger
+    counter = _LockCounter()
+    flask_app.logger.addHandler(counter)
+
+    @flask_app.get(STATS_ROUTE)
+    def _loadtest_stats():
+        with counter._mutex:
+            return jsonify({"locked": counter.locked, "other": counter.other})
+
+    # Keep per-request access logs out of the report
+    logging.getLogger("werkzeug").setLevel(logging.ERROR)
+    make_server("127.0.0.1", port, flask_app, threaded=True).serve_forever()
+
+
+# ------------------------------------------------------------------------
+# Temp DB + child process management
+# ------------------------------------------------------------------------
+
+
+def stub_quiz_row(rng):
+    """
+    Same tuple as seed_quiz.build_row() but with random advice.
+
+    Calling the real solver costs ~1 s per row; /api/quiz/* only reads the
+    stored solver_json, so its contents don’t affect the load profile.
+    """
+    hero = rng.sample(DECK, 2)
+    pot = rng.randrange(10, 120, 5)
+    bet = round(rng.choice([0.25, 0.5, 0.75]) * pot, 2)
+    req = {
+        "hero_cards": hero,
+        "pot_size": pot,
+        "facing_bet": bet,
+        "num_villains": 1,
+        "position": rng.choice(POSITIONS),
+        "street": "preflop",
+        "board_cards": []
+    }
+    advice = rng.choice(["fold", "call", "raise"])
+    return (
+        "".join(hero),
+        req["position"],
+        req["street"],
+        pot,
+        bet,
+        json.dumps({
+            **req,
+            "advice": advice,
+            "raise_size": pot + 2 * bet if advice == "raise" else None
+        })
+    )
+
+
+def build_db(path: pathlib.Path, quiz_rows: int, seed: int):
+    """Create schema at *path* and seed *quiz_rows* stub quiz_bank rows."""
+    print(f"… seeding {quiz_rows} quiz rows into temp DB", file=sys.stderr)
+    rng = random.Random(seed)
+    with closing(sqlite3.connect(path)) as conn, conn:
+        conn.executescript(SCHEMA_FILE.read_text())
+        conn.executemany(
+            """INSERT INTO quiz_bank
+                   (hero_cards, position, street, pot_size, facing_bet, solver_json)
+                   VALUES (?,?,?,?,?,?)""",
+            [stub_quiz_row(rng) for _ in range(quiz_rows)],
+        )
+
+
+def free_port():
+    """Ask the OS for an unused TCP port."""
+    with closing(socket.socket()) as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(db_path: pathlib.Path, workdir: str, timeout: float = 15.0):
+    """Spawn the --serve child and block until it answers HTTP."""
+    port = free_port()
+    proc = subprocess.Popen(
+        [sys.executable, str(ROOT / "load_test.py"),
+         "--serve", str(port), "--db", str(db_path)],
+        cwd=workdir,                     # flask_session/ lands in temp dir
+    )
+    base = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            urllib.request.urlopen(base + STATS_ROUTE, timeout=1).read()
+            return proc, base
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.1)
+    proc.terminate()
+    raise RuntimeError("server did not start in time")
+
+
+# ------------------------------------------------------------------------
+# Client side – traffic generation
+# ------------------------------------------------------------------------
+
+
+def weighted_choice(rng, weights: dict):
+    """Pick a key from *weights* proportionally to its value."""
+    keys = list(weights)
+    return rng.choices(keys, weights=[weights[k] for k in keys])[0]
+
+
+def random_spot(rng, mix: dict):
+    """Build a /api/solve payload with street + villains drawn from *mix*."""
+    street = weighted_choice(rng, mix["streets"])
+    cards = rng.sample(DECK, 2 + BOARD_SIZE[street])
+    pot = rng.randrange(10, 120, 5)
+    return {
+        "hero_cards": cards[:2],
+        "board_cards": cards[2:],
+        "pot_size": pot,
+        "facing_bet": round(rng.choice([0, 0.25, 0.5, 0.75]) * pot, 2),
+        "num_villains": int(weighted_choice(rng, mix["villains"])),
+        "position": rng.choice(POSITIONS),
+        "street": street,
+    }
+
+
+def call(base: str, method: str, path: str, payload=None):
+    """
+    Perform one HTTP call.
+
+    Returns (status, parsed JSON or None, latency seconds). Network
+    failures are reported as status 0 so they still count as errors.
+    """
+    body = json.dumps(payload).encode() if payload is not None else None
+    req = urllib.request.Request(
+        base + path, data=body, method=method,
+        headers={"Content-Type": "application/json"} if body else {},
+    )
+    t0 = time.perf_counter()
+    try:
+        with urllib.request.urlopen(req, timeout=60) as resp:
+            raw, status = resp.read(), resp.status
+    except urllib.error.HTTPError as e:
+        raw, status = e.read(), e.code
+    except (urllib.error.URLError, ConnectionError, TimeoutError):
+        return 0, None, time.perf_counter() - t0
+    elapsed = time.perf_counter() - t0
+    try:
+        data = json.loads(raw)
+    except ValueError:
+        data = None
+    return status, data, elapsed
+
+
+def worker(base: str, mix: dict, deadline: float, seed: int, out: list):
+    """
+    Loop over weighted actions until *deadline*, appending samples.
+
+    Any unexpected exception (bad HTTP framing, malformed JSON body …) is
+    recorded as a status-0 sample for the endpoint in flight so a dying
+    call shows up as an error rather than silently lowering throughput.
+    """
+    rng = random.Random(seed)
+    while time.monotonic() < deadline:
+        if out and out[-1][2] == 0:
+            time.sleep(CONNECT_BACKOFF_S)
+        endpoint, t0 = None, time.perf_counter()
+        try:
+            action = weighted_choice(rng, mix["actions"])
+            if action == "solve":
+                endpoint = "/api/solve"
+                status, _, dt = call(base, "POST", endpoint,
+                                     random_spot(rng, mix))
+                out.append((endpoint, dt, status))
+            elif action == "history":
+                endpoint = "/api/history"
+                status, _, dt = call(base, "GET", endpoint)
+                out.append((endpoint, dt, status))
+            else:
+                endpoint = "/api/quiz/next"
+                status, row, dt = call(base, "GET", endpoint)
+                out.append((endpoint, dt, status))
+                if status != 200 or not row:
+                    continue
+                endpoint, t0 = "/api/quiz/answer", time.perf_counter()
+                status, _, dt = call(base, "POST", endpoint, {
+                    "id": row["id"],
+                    "user_action": rng.choice(["fold", "call", "raise"]),
+                })
+                out.append((endpoint, dt, status))
+        except Exception:
+            out.append((endpoint or "unknown", time.perf_counter() - t0, 0))
+
+
+# ------------------------------------------------------------------------
+# Statistics
+# ------------------------------------------------------------------------
+
+
+def percentile(sorted_vals: list, pct: float):
+    """Nearest‑rank percentile of an already sorted list."""
+    if not sorted_vals:
+        return None
+    k = max(0, math.ceil(pct / 100 * len(sorted_vals)) - 1)
+    return sorted_vals[k]
+
+
+def summarise(samples: list, wall: float):
+    """Latency (ms) + throughput summary for a list of samples."""
+    lat = sorted(dt * 1000 for _, dt, _ in samples)
+    errors = sum(1 for _, _, status in samples if status != 200)
+    return {
+        "requests": len(samples),
+        "errors": errors,
+        "throughput_rps": round(len(samples) / wall, 2) if wall else 0.0,
+        "latency_ms": {
+            "p50": _ms(percentile(lat, 50)),
+            "p90": _ms(percentile(lat, 90)),
+            "p99": _ms(percentile(lat, 99)),
+            "max": _ms(lat[-1] if lat else None),
+        },
+    }
+
+
+def _ms(value):
+    return round(value, 2) if value is not None else None
+
+
+def server_error_counts(bases: list):
+    """
+    Sum the {locked, other} counters of every server process.
+
+    Returns None if any process is unreachable, since a partial sum would
+    under‑report errors.
+    """
+    total = {"locked": 0, "other": 0}
+    for base in bases:
+        status, data, _ = call(base, "GET", STATS_ROUTE)
+        if status != 200 or not isinstance(data, dict):
+            return None
+        for key in total:
+            total[key] += data[key]
+    return total
+
+
+def _delta(before, after, key):
+    """Counter growth across a level; None when either snapshot failed."""
+    if before is None or after is None:
+        return None
+    return after[key] - before[key]
+
+
+def exited_servers(procs: list):
+    """Return the exit codes of any server processes that have died."""
+    return [code for code in (p.poll() for p in procs) if code is not None]
+
+
+def run_level(bases: list, mix: dict, concurrency: int, duration: float,
+              seed: int):
+    """
+    Drive *concurrency* client threads for *duration* seconds and summarise.
+
+    Threads are assigned round‑robin to the server processes in *bases*.
+    """
+    before = server_error_counts(bases)
+    buckets = [[] for _ in range(concurrency)]
+    deadline = time.monotonic() + duration
+    threads = [
+        threading.Thread(target=worker,
+                         args=(bases[i % len(bases)], mix, deadline,
+                               seed + i, buckets[i]))
+        for i in range(concurrency)
+    ]
+    t0 = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - t0
+    after = server_error_counts(bases)
+
+    samples = [s for bucket in buckets for s in bucket]
+    by_endpoint = {}
+    for s in samples:
+        by_endpoint.setdefault(s[0], []).append(s)
+
+    report = {"concurrency": concurrency, "wall_s": round(wall, 2)}
+    report.update(summarise(samples, wall))
+    report["sqlite_lock_errors"] = _delta(before, after, "locked")
+    report["other_server_errors"] = _delta(before, after, "other")
+    report["endpoints"] = {
+        ep: summarise(rows, wall) for ep, rows in sorted(by_endpoint.items())
+    }
+    return report
+
+
+# ------------------------------------------------------------------------
+# main() – argument parsing and sweep
+# ------------------------------------------------------------------------
+
+
+def load_mix(path):
+    """Return DEFAULT_MIX overlaid with the sections found in *path*."""
+    mix = {k: dict(v) for k, v in DEFAULT_MIX.items()}
+    if path:
+        user = json.loads(pathlib.Path(path).read_text())
+        for key, weights in user.items():
+            if key not in mix:
+                raise ValueError(f"unknown mix section: {key}")
+            mix[key] = {str(k): float(v) for k, v in weights.items()}
+    unknown = set(mix["streets"]) - set(BOARD_SIZE)
+    if unknown:
+        raise ValueError(f"unknown street(s): {', '.join(sorted(unknown))}")
+    unknown = set(mix["actions"]) - {"solve", "history", "quiz"}
+    if unknown:
+        raise ValueError(f"unknown action(s): {', '.join(sorted(unknown))}")
+    for key in mix["villains"]:
+        try:
+            ok = 1 <= int(key) <= MAX_VILLAINS
+        except ValueError:
+            ok = False
+        if not ok:
+            raise ValueError(
+                f"villain count must be an integer 1..{MAX_VILLAINS}: {key}")
+    # rng.choices needs non-negative weights with a positive total
+    for section, weights in mix.items():
+        if any(w < 0 for w in weights.values()):
+            raise ValueError(f"negative weight in mix section: {section}")
+        if sum(weights.values()) <= 0:
+            raise ValueError(f"mix section has no positive weight: {section}")
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Load-test the Flask API against a temp poker.db.")
+    parser.add_argument("--levels", default="1,2,4,8,16",
+                        help="comma‑separated concurrency levels")
+    parser.add_argument("--duration", type=float, default=10.0,
+                        help="seconds to run each level")
+    parser.add_argument("--mix", help="JSON file overriding DEFAULT_MIX")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="server processes (≈ gunicorn -w); each one "
+                             "is capped at a single core by the GIL")
+    parser.add_argument("--quiz-rows", type=int, default=50,
+                        help="quiz_bank rows seeded into the temp DB")
+    parser.add_argument("--seed", type=int, default=0,
+                        help="RNG seed for reproducible traffic")
+    parser.add_argument("--out", help="write JSON report here, not stdout")
+    # Internal: child‑process mode used by start_server()
+    parser.add_argument("--serve", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("--db", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.serve, args.db)
+        return
+
+    mix = load_mix(args.mix)
+    if args.workers < 1:
+        parser.error("--workers must be >= 1")
+    try:
+        levels = [int(n) for n in args.levels.split(",") if n.strip()]
+    except ValueError:
+        parser.error(f"--levels must be integers: {args.levels}")
+    if not levels or min(levels) < 1:
+        parser.error("--levels must be one or more integers >= 1")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = pathlib.Path(tmp) / "poker.db"
+        build_db(db_path, args.quiz_rows, args.seed)
+        procs, bases, aborted = [], [], None
+        try:
+            for _ in range(args.workers):
+                proc, base = start_server(db_path, tmp)
+                procs.append(proc)
+                bases.append(base)
+            results = []
+            for n in levels:
+                codes = exited_servers(procs)
+                if codes:
+                    # The level that just ran was measured against a dying
+                    # server – flag it rather than trust its numbers
+                    if results:
+                        results[-1]["server_exited"] = True
+                    aborted = (f"server process exited (code {codes[0]}) "
+                               f"before concurrency {n}")
+                    print(f"❌  {aborted}; aborting sweep.", file=sys.stderr)
+                    break
+                print(f"… concurrency {n} for {args.duration:g}s",
+                      file=sys.stderr)
+                results.append(
+                    run_level(bases, mix, n, args.duration, args.seed))
+            else:
+                if exited_servers(procs):
+                    results[-1]["server_exited"] = True
+                    aborted = "server process exited during the last level"
+        finally:
+            for proc in procs:
+                proc.terminate()
+                proc.wait()
+
+    report = {
+        "mix": mix,
+        "duration_s": args.duration,
+        "quiz_rows": args.quiz_rows,
+        # Each process serves requests on threads sharing one GIL, so
+        # solver throughput scales with processes, not with concurrency
+        "server": {"mode": "werkzeug-threaded", "processes": args.workers},
+        "levels": results,
+        "aborted": aborted,
+    }
+    text = json.dumps(report, indent=2)
+    if args.out:
+        pathlib.Path(args.out).write_text(text + "\n")
+        print(f"✅  Wrote load report to {args.out}.", file=sys.stderr)
+    else:
+        print(text)
+    if aborted:
+        sys.exit(1)
+
+
+# ------------------------------------------------------------------------
+# Entry‑point guard
+# ------------------------------------------------------------------------
+if __name__ == "__main__":
+    main()